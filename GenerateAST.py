@@ -14,12 +14,23 @@ base_desc = {
     }
 }
 
+# Class attributes of the base classes, as [name, default]
+base_attributes = {
+    "Expr": [["lox_type", '"unknown"'], ["proven_safe", "False"]]
+}
+
 
-def defineAst(con, base_name, types):
+def defineAst(con, base_name, types, attributes = []):
     """Generate the AST structure classes for the 'base_name' root."""
     con.write("import scanner\n\n\n")
-    con.writelines(["class " + base_name + ":\n",
-                    tab + "pass\n\n"])
+    con.write("class " + base_name + ":\n")
+    if attributes:
+        con.write(tab + "# Filled in by the typechecker\n")
+        con.writelines([tab + name + " = " + default + "\n"
+                        for name, default in attributes])
+        con.write("\n")
+    else:
+        con.write(tab + "pass\n\n")
     for expr_type, expr in types.items():
         defineType(con, base_name, expr_type, expr)
 
@@ -53,4 +64,4 @@ def defineType(con, base_name, class_name, fields):
 if __name__ == "__main__":
     path = "grammar.py"
     with open(path, "w+") as con:
-        defineAst(con, "Expr", base_desc["Expr"])
+        defineAst(con, "Expr", base_desc["Expr"], base_attributes["Expr"])
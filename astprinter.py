@@ -1,43 +1,94 @@
 #! /usr/local/bin/python3
 
+import io
+import json
+
 import grammar
 import scanner
 
 class AstPrinter:
+    """Prints expressions as S-expressions, like (* (- 123) (group 45.67)).
+
+    Each visit method returns the name of a node and its children, and
+    write() walks the tree from an explicit stack. Output takes time
+    linear in the size of the tree and any depth of nesting."""
+
+    # How many pieces of output to gather before each write
+    _WRITE_BATCH = 4096
+
     def printast(self, expr):
-        return expr.accept(self)
+        out = io.StringIO()
+        self.write(expr, out)
+        return out.getvalue()
+
+    def write(self, expr, out):
+        """Stream the S-expression for expr to the file-like out."""
+        pieces = []
+        stack = [expr]
+
+        while stack:
+            item = stack.pop()
+
+            if isinstance(item, str):
+                pieces.append(item)
+            else:
+                name, children = item.accept(self)
+                if children is None:
+                    pieces.append(name)
+                else:
+                    pieces.append("(" + name)
+                    stack.append(")")
+                    for child in reversed(children):
+                        stack.append(child)
+                        stack.append(" ")
+
+            if len(pieces) >= self._WRITE_BATCH:
+                out.write("".join(pieces))
+                pieces.clear()
+
+        out.write("".join(pieces))
+
+    def literal(self, value):
+        return str(value)
 
     def visitChain(self, expr):
-        return self.parenthesize("chain", expr.left, expr.right)
+        return "chain", (expr.left, expr.right)
 
     def visitBinary(self, expr):
-        return self.parenthesize(expr.operator.lexeme, expr.left, expr.right)
+        return expr.operator.lexeme, (expr.left, expr.right)
 
     def visitGrouping(self, expr):
-        return self.parenthesize("group", expr.expression)
+        return "group", (expr.expression,)
 
     def visitLiteral(self, expr):
-        return str(expr.value)
+        return self.literal(expr.value), None
 
     def visitUnary(self, expr):
-        return self.parenthesize(expr.operator.lexeme, expr.right)
-
-    def parenthesize(self, name, *exprs):
-        string = "(" + name
+        return expr.operator.lexeme, (expr.right,)
 
-        for expr in exprs:
-            string += " "
-            string += expr.accept(self)
 
-        string += ")"
+class AstDumper(AstPrinter):
+    """Prints S-expressions that astreader can turn back into the same
+    tree. Strings are quoted and escaped, and nil, true and false are
+    spelled as in Lox."""
 
-        return string
+    def literal(self, value):
+        if value is None:
+            return "nil"
+        elif value is True:
+            return "true"
+        elif value is False:
+            return "false"
+        elif isinstance(value, str):
+            return json.dumps(value)
+        else:
+            return repr(value)
 
 if __name__ == "__main__":
     expression = grammar.Binary(
         grammar.Unary(
             scanner.Token(scanner.TokenType.MINUS, "-", None, 1),
-            Literal(123)),
+            grammar.Literal(123)),
         scanner.Token(scanner.TokenType.STAR, "*", None, 1),
         grammar.Grouping(
             grammar.Literal(45.67)))
@@ -0,0 +1,165 @@
+#! /usr/local/bin/python3
+
+import json
+import re
+
+import astprinter
+import grammar
+import scanner
+
+
+# Parentheses, quoted strings with JSON escapes, and bare atoms
+_TOKENS = re.compile(r'[()]|"(?:[^"\\]|\\.)*"|[^\s()]+')
+
+_OPERATORS = {
+    "-": scanner.TokenType.MINUS,
+    "+": scanner.TokenType.PLUS,
+    "/": scanner.TokenType.SLASH,
+    "*": scanner.TokenType.STAR,
+    "!": scanner.TokenType.BANG,
+    "!=": scanner.TokenType.BANG_EQUAL,
+    "==": scanner.TokenType.EQUAL_EQUAL,
+    ">": scanner.TokenType.GREATER,
+    ">=": scanner.TokenType.GREATER_EQUAL,
+    "<": scanner.TokenType.LESS,
+    "<=": scanner.TokenType.LESS_EQUAL
+}
+
+# Tokens are never changed after scanning, so nodes can share these
+_OPERATOR_TOKENS = {lexeme: scanner.Token(token_type, lexeme, None, 0)
+                    for lexeme, token_type in _OPERATORS.items()}
+
+_KEYWORD_LITERALS = {"nil": None, "true": True, "false": False}
+
+
+class ReadError(Exception):
+    """Raise when the text is not an S-expression AstDumper could write."""
+
+
+def dump(expr, out):
+    """Stream the expression to the file-like out in the form read() takes."""
+    astprinter.AstDumper().write(expr, out)
+
+
+def load(file):
+    return read(file.read())
+
+
+def read(text):
+    """Turn the S-expression written by AstDumper back into grammar nodes.
+
+    Works from an explicit stack, so nesting depth is not limited by
+    Python's recursion limit. Source lines are not part of the dump, so
+    operator tokens come back on line 0."""
+    # Each frame is the name of an open node followed by its children
+    stack = []
+    result = None
+
+    for match in _TOKENS.finditer(text):
+        atom = match.group()
+
+        if result is not None:
+            raise ReadError("Expect end of input after expression.")
+
+        if atom == "(":
+            stack.append([])
+        elif atom == ")":
+            if not stack or not stack[-1]:
+                raise ReadError("Unexpected ')'.")
+            frame = stack.pop()
+            if not isinstance(frame[0], str):
+                raise ReadError("Expect a node name after '('.")
+            node = _node(frame[0], frame[1:])
+            if stack:
+                stack[-1].append(node)
+            else:
+                result = node
+        elif stack and not stack[-1]:
+            # The name of the node just opened
+            if atom[0] == '"':
+                raise ReadError("Expect a node name after '('.")
+            stack[-1].append(atom)
+        else:
+            node = grammar.Literal(_literal(atom))
+            if stack:
+                stack[-1].append(node)
+            else:
+                result = node
+
+    if stack or result is None:
+        raise ReadError("Unexpected end of input.")
+
+    return result
+
+
+def _literal(atom):
+    if atom in _KEYWORD_LITERALS:
+        return _KEYWORD_LITERALS[atom]
+    elif atom[0] == '"':
+        try:
+            return json.loads(atom)
+        except ValueError:
+            raise ReadError("Bad string '" + atom + "'.") from None
+
+    try:
+        return int(atom)
+    except ValueError:
+        pass
+
+    try:
+        return float(atom)
+    except ValueError:
+        raise ReadError("Unknown atom '" + atom + "'.") from None
+
+
+def _node(name, children):
+    if name == "group" and len(children) == 1:
+        return grammar.Grouping(children[0])
+    elif name == "chain" and len(children) == 2:
+        return grammar.Chain(children[0], children[1])
+    elif name in _OPERATORS and len(children) in (1, 2):
+        token = _OPERATOR_TOKENS[name]
+        if len(children) == 1:
+            return grammar.Unary(token, children[0])
+        return grammar.Binary(children[0], token, children[1])
+
+    raise ReadError("Unknown node '" + name + "' with " +
+                    str(len(children)) + " children.")
+
+
+def _benchmark(terms = 20000):
+    """Compare reading a dumped tree against scanning and parsing its
+    source, and check the dump survives a round trip."""
+    import io
+    import time
+    import lox
+    import parser
+
+    source = " + ".join(['(1.5 * -2 == !nil) != ("a\\n" + "b")'] * terms)
+    program = lox.lox()
+
+    start = time.perf_counter()
+    tokens = scanner.Scanner(program, source).scan_tokens()
+    expression = parser.Parser(program, tokens).parse()
+    parse_time = time.perf_counter() - start
+
+    out = io.StringIO()
+    start = time.perf_counter()
+    dump(expression, out)
+    dump_time = time.perf_counter() - start
+    text = out.getvalue()
+
+    start = time.perf_counter()
+    copy = read(text)
+    read_time = time.perf_counter() - start
+
+    again = io.StringIO()
+    dump(copy, again)
+    assert again.getvalue() == text
+
+    print("scan and parse: " + format(parse_time, ".3f") + "s")
+    print("dump: " + format(dump_time, ".3f") + "s")
+    print("read: " + format(read_time, ".3f") + "s")
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,154 @@
+#! /usr/local/bin/python3
+
+import asyncio
+import concurrent.futures
+import threading
+import weakref
+
+import budget as bgt
+import session as ses
+
+
+# Re-exported so callers only need this module
+LoxError = ses.LoxError
+
+# Shared by every call made in this process
+_core = ses.Core()
+
+
+def evaluate_sync(source, budget = None):
+    """Scan, parse and evaluate the source on the calling thread and
+    return its Lox value. Raises LoxError or BudgetExceeded."""
+    return ses.Session(_core).evaluate(source, budget)
+
+
+def _fresh_budget(template):
+    """A budget with the template's limits. Every call gets its own, so
+    cancelling one call can not reach into another."""
+    return bgt.Budget() if template is None else template.copy()
+
+
+def _release(loop, slots):
+    """Give a slot back from whichever thread the worker finished on."""
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        # The loop is closed, and its semaphore is gone with it
+        pass
+
+
+class AsyncEvaluator:
+    """Evaluates Lox sources for asyncio code without blocking the event loop.
+
+    Scanning, parsing and evaluation run on a bounded thread pool, or on
+    the given executor. A ProcessPoolExecutor keeps the GIL away from the
+    event loop, but can not stop an evaluation early on cancellation. At most
+    max_concurrency calls per event loop are in the executor at once;
+    further callers wait their turn, which gives backpressure to whoever
+    is producing work. A call that times out or is cancelled keeps its
+    slot until its worker has actually finished."""
+
+    def __init__(self, max_workers = 4, max_concurrency = None, executor = None):
+        if max_concurrency is None:
+            max_concurrency = max_workers
+
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers, thread_name_prefix = "pylox")
+
+        self._executor = executor
+        self._max_concurrency = max_concurrency
+
+        # A semaphore only works on one event loop, so each gets its own
+        self._slots = weakref.WeakKeyDictionary()
+        self._slots_lock = threading.Lock()
+
+    def _loop_slots(self, loop):
+        with self._slots_lock:
+            slots = self._slots.get(loop)
+            if slots is None:
+                slots = asyncio.Semaphore(self._max_concurrency)
+                self._slots[loop] = slots
+            return slots
+
+    async def evaluate(self, source, timeout = None, budget = None):
+        """Return the Lox value of the source.
+
+        Raises LoxError for scan, parse and runtime errors, BudgetExceeded
+        when a limit of the budget is hit and TimeoutError once timeout
+        seconds have passed. A timed out or cancelled call stops its
+        evaluation at the next budget checkpoint."""
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots(loop)
+        await slots.acquire()
+
+        call_budget = _fresh_budget(budget)
+        try:
+            work = self._executor.submit(evaluate_sync, source, call_budget)
+        except BaseException:
+            slots.release()
+            raise
+
+        # Released when the worker is done rather than when this call
+        # returns, so abandoned work still counts against the limit
+        work.add_done_callback(lambda _: _release(loop, slots))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(work), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            call_budget.cancel()
+            raise
+
+    def close(self, wait = True):
+        if self._owns_executor:
+            self._executor.shutdown(wait = wait, cancel_futures = True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close(wait = False)
+
+
+_default_evaluator = None
+
+async def evaluate(source, timeout = None, budget = None):
+    """Evaluate the source with a shared, lazily created AsyncEvaluator."""
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = AsyncEvaluator()
+
+    return await _default_evaluator.evaluate(source, timeout, budget)
+
+
+async def _load_test(calls = 2000, size = 200):
+    """Run many concurrent evaluations while measuring how late a 1ms
+    heartbeat on the event loop wakes up."""
+    source = " + ".join(["1"] * size)
+    worst_lag = 0.0
+    done = False
+
+    async def heartbeat():
+        nonlocal worst_lag
+        loop = asyncio.get_running_loop()
+        while not done:
+            before = loop.time()
+            await asyncio.sleep(0.001)
+            worst_lag = max(worst_lag, loop.time() - before - 0.001)
+
+    async with AsyncEvaluator() as evaluator:
+        beat = asyncio.create_task(heartbeat())
+        start = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*[evaluator.evaluate(source)
+                                         for _ in range(calls)])
+        elapsed = asyncio.get_running_loop().time() - start
+        done = True
+        await beat
+
+    assert all(result == size for result in results)
+    print(str(calls) + " evaluations in " + format(elapsed, ".3f") + "s, " +
+          "worst event loop lag " + format(worst_lag * 1000, ".2f") + "ms")
+
+if __name__ == "__main__":
+    asyncio.run(_load_test())
@@ -0,0 +1,112 @@
+import time
+
+class BudgetExceeded(Exception):
+    """Raise when a run goes over one of the limits of its Budget."""
+    def __init__(self, limit, message):
+        super().__init__(message)
+        self.limit = limit
+        self.message = message
+
+    def __reduce__(self):
+        return (BudgetExceeded, (self.limit, self.message))
+
+
+def depth_exceeded():
+    """The error for an expression nested deeper than the scanner, parser
+    or interpreter can recurse. This limit applies with or without a
+    Budget, and is reported like one."""
+    return BudgetExceeded("depth", "Exceeded maximum nesting depth.")
+
+
+class Budget:
+    """Resource limits for a single run of the interpreter.
+
+    Any limit left as None is unlimited. The deadline is a number of
+    seconds of wall-clock time, measured from the call to start()."""
+
+    # Most evaluated nodes between two checkpoints, and so between
+    # two looks at the clock
+    CHECKPOINT_INTERVAL = 1024
+
+    def __init__(self, max_nodes = None, max_tokens = None,
+                 max_string_length = None, deadline = None):
+        self.max_nodes = max_nodes
+        self.max_tokens = max_tokens
+        self.max_string_length = max_string_length
+        self.deadline = deadline
+        self._cancelled = False
+
+        self.start()
+
+    def copy(self):
+        """A new budget with the same limits, for a run of its own. Runs
+        must not share a budget: start() resets it, and its counts and
+        cancellation would carry over between them."""
+        return Budget(self.max_nodes, self.max_tokens,
+                      self.max_string_length, self.deadline)
+
+    def start(self):
+        """Reset the counters and the clock for a new run. The nodes count
+        is only brought up to date at each checkpoint."""
+        self.nodes = 0
+        self._allotted = 0
+
+        if self.deadline is None:
+            self._expires = None
+        else:
+            self._expires = time.monotonic() + self.deadline
+
+    def checkpoint(self):
+        """Account for the nodes allotted at the last checkpoint and check
+        the node limit and deadline. Returns how many nodes the interpreter
+        may evaluate before calling checkpoint() again.
+
+        Counting in blocks keeps the interpreter's per node cost down to
+        a decrement and a comparison."""
+        self.nodes += self._allotted
+
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded("max_nodes",
+                                 "Exceeded maximum of " + str(self.max_nodes) +
+                                 " evaluated nodes.")
+        self.check_deadline()
+
+        self._allotted = self.CHECKPOINT_INTERVAL
+        if self.max_nodes is not None:
+            # Stop exactly at the first node past the limit
+            self._allotted = min(self._allotted, self.max_nodes - self.nodes + 1)
+
+        return self._allotted
+
+    def count_token(self, count):
+        """Called by the scanner as it adds each token, so an oversized
+        source is stopped before all of it is scanned."""
+        self.check_tokens(count)
+        if count % self.CHECKPOINT_INTERVAL == 0:
+            self.check_deadline()
+
+    def check_tokens(self, count):
+        if self.max_tokens is not None and count > self.max_tokens:
+            raise BudgetExceeded("max_tokens",
+                                 "Exceeded maximum of " + str(self.max_tokens) +
+                                 " tokens.")
+
+    def check_string_length(self, length):
+        if self.max_string_length is not None and length > self.max_string_length:
+            raise BudgetExceeded("max_string_length",
+                                 "Exceeded maximum string length of " +
+                                 str(self.max_string_length) + ".")
+
+    def cancel(self):
+        """Ask a run using this budget to stop at its next checkpoint. This
+        may be called from another thread, and a cancelled budget stays
+        cancelled."""
+        self._cancelled = True
+
+    def check_deadline(self):
+        if self._cancelled:
+            raise BudgetExceeded("cancelled", "Run was cancelled.")
+        if self._expires is not None and time.monotonic() > self._expires:
+            raise BudgetExceeded("deadline",
+                                 "Exceeded deadline of " + str(self.deadline) +
+                                 " seconds.")
@@ -2,7 +2,9 @@ import scanner
 
 
 class Expr:
-    pass
+    # Filled in by the typechecker
+    lox_type = "unknown"
+    proven_safe = False
 
 
 class Chain(Expr):
@@ -1,4 +1,5 @@
 import numbers
+import operator
 import scanner
 
 class LoxRuntimeError(Exception):
@@ -40,6 +41,11 @@ def _concatOrAdd(operator, left, right):
     else:
         raise LoxRuntimeError(operator, "Operands must be two numbers or two strings.")
 
+def _divide(operator, left, right):
+    if float(right) == 0:
+        raise LoxRuntimeError(operator, "Division by zero.")
+    return float(left) / float(right)
+
 def _checkNumberOperand(operator, operand):
     if isinstance(operand, numbers.Number):
         return
@@ -56,19 +62,43 @@ class Interpreter:
 
     def __init__(self, lox):
         self._lox = lox
+        self._budget = None
+        self._budget_ticks = 0
 
-    def interpret(self, expression):
+    def interpret(self, expression, budget = None):
+        """Evaluate and print the expression. A Budget exceeded along the
+        way raises BudgetExceeded rather than a LoxRuntimeError."""
         try:
-            value = self._evaluate(expression)
+            value = self.evaluate(expression, budget)
             print(_stringify(value))
         except LoxRuntimeError as error:
             self._lox.runtime_error(error)
 
+    def evaluate(self, expression, budget = None):
+        """Evaluate the expression and return its value. Runtime errors are
+        raised to the caller instead of being reported."""
+        self._budget = budget
+        if budget is not None:
+            self._budget_ticks = budget.checkpoint()
+
+        try:
+            return self._evaluate(expression)
+        finally:
+            self._budget = None
+
     def _evaluate(self, expr):
+        if self._budget is not None:
+            self._budget_ticks -= 1
+            if not self._budget_ticks:
+                self._budget_ticks = self._budget.checkpoint()
         return expr.accept(self)
 
 
 
+    def visitChain(self, expr):
+        self._evaluate(expr.left)
+        return self._evaluate(expr.right)
+
     def visitLiteral(self, expr):
         return expr.value
 
@@ -81,10 +111,11 @@ class Interpreter:
         op_type = expr.operator.token_type
 
         if op_type is scanner.TokenType.MINUS:
-            _checkNumberOperand(expr.operator, right)
+            if not expr.proven_safe:
+                _checkNumberOperand(expr.operator, right)
             return -float(right)
         elif op_type is scanner.TokenType.BANG :
-            return isTrue(right)
+            return not _isTrue(right)
 
         return None
 
@@ -95,19 +126,23 @@ class Interpreter:
         op_type = expr.operator.token_type
 
         if op_type is scanner.TokenType.GREATER:
-            _checkNumberOperands(expr.operator, left, right)
-            return float(left) >= float(right)
+            if not expr.proven_safe:
+                _checkNumberOperands(expr.operator, left, right)
+            return float(left) > float(right)
 
-        elif op_type is scanner.TokenType.GREATER:
-            _checkNumberOperands(expr.operator, left, right)
+        elif op_type is scanner.TokenType.GREATER_EQUAL:
+            if not expr.proven_safe:
+                _checkNumberOperands(expr.operator, left, right)
             return float(left) >= float(right)
 
         elif op_type is scanner.TokenType.LESS:
-            _checkNumberOperands(expr.operator, left, right)
+            if not expr.proven_safe:
+                _checkNumberOperands(expr.operator, left, right)
             return float(left) < float(right)
 
         elif op_type is scanner.TokenType.LESS_EQUAL:
-            _checkNumberOperands(expr.operator, left, right)
+            if not expr.proven_safe:
+                _checkNumberOperands(expr.operator, left, right)
             return float(left) <= float(right)
 
         elif op_type is scanner.TokenType.EQUAL_EQUAL:
@@ -117,20 +152,136 @@ class Interpreter:
             return not _isEqual(left, right)
 
         elif op_type is scanner.TokenType.MINUS:
-            _checkNumberOperands(expr.operator, left, right)
+            if not expr.proven_safe:
+                _checkNumberOperands(expr.operator, left, right)
             return float(left) - float(right)
 
         elif op_type is scanner.TokenType.PLUS:
+            # Check the length before concatenating, not after
+            if self._budget is not None and isinstance(left, str) and isinstance(right, str):
+                self._budget.check_string_length(len(left) + len(right))
+            if expr.proven_safe:
+                if expr.lox_type == "string":
+                    return left + right
+                return float(left) + float(right)
             return _concatOrAdd(expr.operator, left, right)
 
         elif op_type is scanner.TokenType.SLASH:
-            _checkNumberOperands(expr.operator, left, right)
-            return float(left) / float(right)
+            if not expr.proven_safe:
+                _checkNumberOperands(expr.operator, left, right)
+            return _divide(expr.operator, left, right)
 
         elif op_type is scanner.TokenType.STAR:
-            _checkNumberOperands(expr.operator, left, right)
+            if not expr.proven_safe:
+                _checkNumberOperands(expr.operator, left, right)
             return float(left) * float(right)
 
         return None
 
 
+# Binary operators that take two numbers, and what they compute
+_NUMBER_OPERATIONS = {
+    scanner.TokenType.GREATER: operator.gt,
+    scanner.TokenType.GREATER_EQUAL: operator.ge,
+    scanner.TokenType.LESS: operator.lt,
+    scanner.TokenType.LESS_EQUAL: operator.le,
+    scanner.TokenType.MINUS: operator.sub,
+    scanner.TokenType.STAR: operator.mul
+}
+
+
+class ClosureCompiler:
+    """Turns an expression tree into nested Python closures that compute
+    what Interpreter would, without dispatching through accept() on every
+    node. Nodes the typechecker proved safe compile without their checks."""
+
+    def compile(self, expression):
+        """Return a function of no arguments evaluating the expression."""
+        return expression.accept(self)
+
+    def visitChain(self, expr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        def chain():
+            left()
+            return right()
+        return chain
+
+    def visitLiteral(self, expr):
+        value = expr.value
+        return lambda: value
+
+    def visitGrouping(self, expr):
+        return expr.expression.accept(self)
+
+    def visitUnary(self, expr):
+        right = expr.right.accept(self)
+        token = expr.operator
+        op_type = token.token_type
+
+        if op_type is scanner.TokenType.MINUS:
+            if expr.proven_safe:
+                return lambda: -float(right())
+
+            def negate():
+                value = right()
+                _checkNumberOperand(token, value)
+                return -float(value)
+            return negate
+
+        elif op_type is scanner.TokenType.BANG:
+            return lambda: not _isTrue(right())
+
+        def unknown():
+            right()
+            return None
+        return unknown
+
+    def visitBinary(self, expr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        token = expr.operator
+        op_type = token.token_type
+
+        if op_type in _NUMBER_OPERATIONS:
+            operation = _NUMBER_OPERATIONS[op_type]
+            if expr.proven_safe:
+                return lambda: operation(float(left()), float(right()))
+
+            def numbers():
+                left_value = left()
+                right_value = right()
+                _checkNumberOperands(token, left_value, right_value)
+                return operation(float(left_value), float(right_value))
+            return numbers
+
+        elif op_type is scanner.TokenType.SLASH:
+            if expr.proven_safe:
+                return lambda: _divide(token, left(), right())
+
+            def divide():
+                left_value = left()
+                right_value = right()
+                _checkNumberOperands(token, left_value, right_value)
+                return _divide(token, left_value, right_value)
+            return divide
+
+        elif op_type is scanner.TokenType.EQUAL_EQUAL:
+            return lambda: _isEqual(left(), right())
+
+        elif op_type is scanner.TokenType.BANG_EQUAL:
+            return lambda: not _isEqual(left(), right())
+
+        elif op_type is scanner.TokenType.PLUS:
+            if expr.proven_safe and expr.lox_type == "string":
+                return lambda: left() + right()
+            elif expr.proven_safe:
+                return lambda: float(left()) + float(right())
+            return lambda: _concatOrAdd(token, left(), right())
+
+        def unknown():
+            left()
+            right()
+            return None
+        return unknown
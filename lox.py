@@ -1,16 +1,46 @@
 #!/usr/local/bin/python3
 
 import sys
+import json
+import math
 import scanner as scn
 import parser as prs
 import interpreter as interp
 import astprinter
+import typechecker
+import budget as bgt
+import session as ses
+
+# Re-exported so callers only need this module
+LoxError = ses.LoxError
+
+
+def _reject_constant(name):
+    """JSON-lines input may not use NaN or Infinity, which are not JSON."""
+    raise ValueError("Unexpected constant " + name + ".")
+
+
+def _lox_type(value):
+    """The name of the Lox type of a value."""
+    if value is None:
+        return "nil"
+    elif isinstance(value, bool):
+        return "bool"
+    elif isinstance(value, str):
+        return "string"
+    else:
+        return "number"
+
 
 class lox:
 
     def __init__(self):
         self.had_error = False
         self.had_runtime_error = False
+        self.had_budget_error = False
+
+        # Shared by the sessions behind evaluate()
+        self._core = ses.Core()
 
         self.interpreter = interp.Interpreter(self)
 
@@ -25,6 +55,8 @@ class lox:
             sys.exit(65)
         elif self.had_runtime_error:
             sys.exit(70)
+        elif self.had_budget_error:
+            sys.exit(75)
 
     def run_prompt(self):
         while True:
@@ -34,14 +66,110 @@ class lox:
             # If we had an error, we should reset at new prompt
             self.had_error = False
             self.had_runtime_error = False
-
-    def run(self, source):
-        scanner = scn.Scanner(self, source)
-        tokens = scanner.scan_tokens()
-        parser = prs.Parser(self, tokens)
-        expression = parser.parse()
-
-        self.interpreter.interpret(expression)
+            self.had_budget_error = False
+
+    def run(self, source, budget = None):
+        """Scan, parse and interpret the source. If a Budget is given,
+        the run is aborted and reported once any of its limits is hit."""
+        if budget is not None:
+            budget.start()
+
+        try:
+            scanner = scn.Scanner(self, source, budget = budget)
+            tokens = scanner.scan_tokens()
+            parser = prs.Parser(self, tokens, budget)
+            expression = parser.parse()
+
+            if expression is not None:
+                typechecker.TypeChecker(self).check(expression)
+
+            # Don't run code with syntax or type errors
+            if self.had_error:
+                return
+
+            self.interpreter.interpret(expression, budget)
+        except bgt.BudgetExceeded as error:
+            self.budget_error(error)
+        except RecursionError:
+            self.budget_error(bgt.depth_exceeded())
+
+    def evaluate(self, source, budget = None):
+        """Scan, parse and evaluate the source and return its Lox value.
+
+        Nothing is printed: each call runs in its own Session, errors raise
+        a LoxError holding the reports, and an exceeded budget raises
+        BudgetExceeded."""
+        return ses.Session(self._core).evaluate(source, budget)
+
+    def run_batch(self, path = None, budget = None):
+        """Evaluate one expression per line of the file, or of stdin, and
+        write one JSON object per result to stdout.
+
+        A line may also be a JSON record {"id": ..., "source": ...}; plain
+        lines are identified by their line number. Results look like
+        {"id": 1, "type": "number", "value": 7.0} or
+        {"id": 2, "error": {"kind": "runtime", "messages": [...]}}. Besides
+        the LoxError kinds, errors can be of kind "input" for bad records,
+        "budget" for exceeded limits, "value" for results JSON can not
+        hold, like infinity, and "internal" for anything else that goes
+        wrong with a single record."""
+        source_file = sys.stdin if path is None else open(path, "r")
+        # Block buffered already when piped to a file or another program
+        out = sys.stdout
+
+        try:
+            for line_number, line in enumerate(source_file, 1):
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    result = self._batch_result(line_number, line, budget)
+                except Exception as error:
+                    # A bug for one record must not end the whole batch
+                    result = {"id": line_number,
+                              "error": {"kind": "internal",
+                                        "messages": [type(error).__name__ + ": " + str(error)]}}
+                out.write(json.dumps(result, allow_nan = False))
+                out.write("\n")
+        finally:
+            out.flush()
+            if path is not None:
+                source_file.close()
+
+    def _batch_result(self, line_number, line, budget):
+        record_id = line_number
+        source = line
+
+        if line.startswith("{"):
+            try:
+                record = json.loads(line, parse_constant = _reject_constant)
+                record_id = record.get("id", line_number)
+                source = record["source"]
+            except (ValueError, KeyError, AttributeError):
+                source = None
+
+            if not isinstance(source, str):
+                return {"id": record_id,
+                        "error": {"kind": "input",
+                                  "messages": ["Expect a JSON record with a string 'source' field."]}}
+
+        try:
+            value = self.evaluate(source, budget)
+        except LoxError as error:
+            return {"id": record_id,
+                    "error": {"kind": error.kind, "messages": error.messages}}
+        except bgt.BudgetExceeded as error:
+            return {"id": record_id,
+                    "error": {"kind": "budget", "limit": error.limit,
+                              "messages": [error.message]}}
+
+        if isinstance(value, float) and not math.isfinite(value):
+            return {"id": record_id,
+                    "error": {"kind": "value",
+                              "messages": ["Result " + str(value) + " is not a finite number."]}}
+
+        return {"id": record_id, "type": _lox_type(value), "value": value}
 
     def parse_error(self, token, msg):
         if token.token_type == scn.TokenType.EOF:
@@ -49,6 +177,9 @@ class lox:
         else:
             self.report(token.line, " at '" + token.lexeme + "'", msg )
 
+    def type_error(self, token, msg):
+        self.report(token.line, " at '" + token.lexeme + "'", msg)
+
     def scan_error(self, line, msg):
         self.report(line, "", msg)
 
@@ -56,6 +187,10 @@ class lox:
         print(error.message, "\n[line ", error.token.line, "]")
         self.had_runtime_error = True
 
+    def budget_error(self, error):
+        print("[budget] Error: " + error.message)
+        self.had_budget_error = True
+
     def report(self, line, where, msg):
         print("[line " + str(line) + "] Error" + str(where) + ": " + str(msg))
         self.had_error = True
@@ -66,8 +201,13 @@ def main():
     program = lox()
     # The first argument in sys.argv will alwyas be lox.py
     num_args = len(sys.argv) - 1
-    if num_args > 1:
-        print("Usage: pylox [script]")
+    if num_args >= 1 and sys.argv[1] == "--batch":
+        if num_args > 2:
+            print("Usage: pylox --batch [file]")
+        else:
+            program.run_batch(sys.argv[2] if num_args == 2 else None)
+    elif num_args > 1:
+        print("Usage: pylox [script] | pylox --batch [file]")
     elif num_args == 1:
         program.run_file(sys.argv[1])
     else:
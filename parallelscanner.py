@@ -0,0 +1,264 @@
+#! /usr/local/bin/python3
+
+import array
+import bisect
+import concurrent.futures
+import os
+import re
+
+import scanner
+
+
+# The only characters that can start a string or a comment
+_SPECIAL = re.compile(r'["/]')
+
+
+def _skipped_regions(source):
+    """Find where the strings and comments of the source are.
+
+    This mirrors how Scanner consumes them, including how it ends block
+    comments. Returns the sorted starts and ends of the regions, and the
+    positions of newlines the Scanner swallows without counting a line."""
+    starts = []
+    ends = []
+    swallowed = []
+    length = len(source)
+
+    match = _SPECIAL.search(source)
+    while match is not None:
+        start = match.start()
+
+        if source[start] == '"':
+            close = source.find('"', start + 1)
+            end = length if close == -1 else close + 1
+        elif source.startswith("//", start):
+            newline = source.find('\n', start + 2)
+            end = length if newline == -1 else newline
+        elif source.startswith("/*", start):
+            end = _block_comment_end(source, start, swallowed)
+        else:
+            # A plain slash token
+            match = _SPECIAL.search(source, start + 1)
+            continue
+
+        starts.append(start)
+        ends.append(end)
+        match = _SPECIAL.search(source, end)
+
+    return starts, ends, swallowed
+
+
+def _block_comment_end(source, start, swallowed):
+    """Scanner stops a block comment at the first '*', or the first
+    character followed by '/', and then consumes two characters."""
+    length = len(source)
+    body = start + 2
+
+    stop = length
+    star = source.find('*', body)
+    if star != -1:
+        stop = star
+    slash = source.find('/', body + 1)
+    if slash != -1:
+        stop = min(stop, slash - 1)
+
+    if stop >= length:
+        # Unterminated, the comment runs to the end of the source
+        return length
+
+    for position in (stop, stop + 1):
+        if position < length and source[position] == '\n':
+            swallowed.append(position)
+
+    return min(stop + 2, length)
+
+
+def _chunk_bounds(source, chunks):
+    """Split offsets just after newlines that lie outside every string and
+    comment, so each chunk starts where the Scanner starts a new token.
+    Returns the offsets and the line number each chunk starts on."""
+    starts, ends, swallowed = _skipped_regions(source)
+    length = len(source)
+    size = length // chunks
+
+    bounds = [0]
+    lines = [0]
+    for chunk in range(1, chunks):
+        position = max(chunk * size, bounds[-1])
+
+        while True:
+            newline = source.find('\n', position)
+            if newline == -1:
+                break
+
+            region = bisect.bisect_right(starts, newline) - 1
+            if region >= 0 and newline < ends[region]:
+                position = ends[region]
+                continue
+
+            break
+
+        if newline == -1 or newline + 1 >= length:
+            break
+
+        bound = newline + 1
+        line = (lines[-1] + source.count('\n', bounds[-1], bound)
+                - (bisect.bisect_left(swallowed, bound) -
+                   bisect.bisect_left(swallowed, bounds[-1])))
+        bounds.append(bound)
+        lines.append(line)
+
+    bounds.append(length)
+    return bounds, lines
+
+
+class _ErrorLog:
+    """Stands in for the interpreter in worker processes, keeping scan
+    errors to be reported in order by the parent."""
+
+    def __init__(self):
+        self.errors = []
+
+    def scan_error(self, line, msg):
+        self.errors.append((line, msg))
+
+
+# Token types by ordinal, for sending them between processes as bytes
+_TOKEN_TYPES = list(scanner.TokenType)
+_ORDINALS = {token_type: ordinal for ordinal, token_type in enumerate(_TOKEN_TYPES)}
+
+
+class _ArrayScanner(scanner.Scanner):
+    """Records each token as its type, offsets into the chunk and line in
+    flat arrays rather than as a Token. Arrays pickle as plain bytes, where
+    lists of Tokens cost about as much to pickle and unpickle as the scan
+    itself."""
+
+    def __init__(self, interpreter, source, line):
+        super().__init__(interpreter, source, line)
+        self.types = array.array('B')
+        self.starts = array.array('q')
+        self.ends = array.array('q')
+        self.lines = array.array('q')
+
+    def _add_token(self, token_type, literal = None):
+        self.types.append(_ORDINALS[token_type])
+        self.starts.append(self._start)
+        self.ends.append(self._current)
+        self.lines.append(self._line)
+
+
+def _scan_chunk(chunk):
+    source, line = chunk
+    log = _ErrorLog()
+    chunk_scanner = _ArrayScanner(log, source, line)
+
+    # Only the chunk's own EOF token ends up in tokens, and it is dropped:
+    # the merged stream gets one at the end
+    chunk_scanner.scan_tokens()
+    return (chunk_scanner.types, chunk_scanner.starts, chunk_scanner.ends,
+            chunk_scanner.lines, log.errors)
+
+
+def _rebuild_tokens(source, offset, types, starts, ends, lines, tokens):
+    """Turn a chunk's arrays back into Tokens, the same as Scanner makes,
+    with offsets moved from the chunk into the whole source."""
+    append = tokens.append
+    number = scanner.TokenType.NUMBER
+    string = scanner.TokenType.STRING
+
+    for ordinal, start, end, line in zip(types, starts, ends, lines):
+        token_type = _TOKEN_TYPES[ordinal]
+        text = source[offset + start:offset + end]
+
+        if token_type is number:
+            literal = float(text) if '.' in text else int(text)
+        elif token_type is string:
+            literal = text[1:-1]
+        else:
+            literal = None
+
+        append(scanner.Token(token_type, text, literal, line))
+
+
+class ParallelScanner:
+    """Scans a large source in chunks on a process pool.
+
+    Produces exactly the tokens, and reports exactly the scan errors, that
+    Scanner does for the same source. Sources smaller than min_chunk_size
+    per chunk are scanned sequentially."""
+
+    def __init__(self, interpreter, source, processes = None,
+                 min_chunk_size = 1 << 20):
+        self._interpreter = interpreter
+        self._source = source
+        self._processes = processes or os.cpu_count() or 1
+        self._min_chunk_size = min_chunk_size
+        self.tokens = []
+
+    def scan_tokens(self):
+        # A few chunks per process evens out the work between them
+        chunks = min(self._processes * 4,
+                     len(self._source) // self._min_chunk_size)
+
+        if self._processes == 1 or chunks <= 1:
+            self.tokens = scanner.Scanner(self._interpreter, self._source).scan_tokens()
+            return self.tokens
+
+        bounds, lines = _chunk_bounds(self._source, chunks)
+        work = [(self._source[bounds[i]:bounds[i + 1]], lines[i])
+                for i in range(len(bounds) - 1)]
+
+        with concurrent.futures.ProcessPoolExecutor(self._processes) as pool:
+            results = pool.map(_scan_chunk, work)
+            for offset, (types, starts, ends, lines, errors) in zip(bounds, results):
+                for line, msg in errors:
+                    self._interpreter.scan_error(line, msg)
+                _rebuild_tokens(self._source, offset, types, starts, ends,
+                                lines, self.tokens)
+
+        self.tokens.append(scanner.Token(scanner.TokenType.EOF, "",
+                                         None, len(self._source) - 1))
+
+        return self.tokens
+
+
+def _benchmark(megabytes = 64):
+    """Time ParallelScanner against Scanner on a generated source for a
+    range of process counts, checking the tokens match. Also times the
+    work the parent always does alone, which bounds the speedup."""
+    import time
+
+    line = ('(1 + 2.5) * "str/*ing" >= 42 / x_1 // comment "\n'
+            '/* block\ncomment */ !true != nil and "multi\nline"\n')
+    source = line * (megabytes * (1 << 20) // len(line))
+    log = _ErrorLog()
+
+    def key(tokens):
+        return [(t.token_type, t.lexeme, t.literal, t.line) for t in tokens]
+
+    start = time.perf_counter()
+    expected = key(scanner.Scanner(log, source).scan_tokens())
+    baseline = time.perf_counter() - start
+    print("sequential: " + format(baseline, ".2f") + "s")
+
+    arrays = _scan_chunk((source, 0))
+    start = time.perf_counter()
+    _chunk_bounds(source, 16)
+    _rebuild_tokens(source, 0, *arrays[:4], [])
+    serial = time.perf_counter() - start
+    print("parent's serial work: " + format(serial, ".2f") + "s, at most " +
+          format(baseline / serial, ".1f") + "x")
+
+    cores = os.cpu_count() or 1
+    print(str(cores) + " cores")
+    for processes in sorted({2, 4, 8, cores}):
+        start = time.perf_counter()
+        tokens = ParallelScanner(log, source, processes).scan_tokens()
+        elapsed = time.perf_counter() - start
+        assert key(tokens) == expected
+        print(str(processes) + " processes: " + format(elapsed, ".2f") + "s, " +
+              format(baseline / elapsed, ".2f") + "x")
+
+if __name__ == "__main__":
+    _benchmark()
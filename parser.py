@@ -6,9 +6,10 @@ class ParseError(Exception):
 
 class Parser:
 
-      def __init__(self, interpreter, token_list):
+      def __init__(self, interpreter, token_list, budget = None):
 
             self._interpreter = interpreter
+            self._budget = budget
 
             # The current head index in the token list
             self._current = 0
@@ -16,6 +17,11 @@ class Parser:
             self.token_list = token_list
 
       def parse(self):
+            if self._budget is not None:
+                  # The EOF token is not counted, as in the scanner
+                  self._budget.check_tokens(len(self.token_list) - 1)
+                  self._budget.check_deadline()
+
             try:
                   return self._expression()
             except ParseError as error:
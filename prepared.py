@@ -0,0 +1,90 @@
+#! /usr/local/bin/python3
+
+import budget as bgt
+import interpreter as interp
+import session as ses
+
+# Shared by every compile() in this process
+_core = ses.Core()
+
+
+class PreparedExpression:
+    """A source scanned, parsed and checked once, ready to be evaluated
+    any number of times.
+
+    Holds the checked tree and the closures ClosureCompiler builds from
+    it. Pickles as its source and tree; the closures are rebuilt."""
+
+    def __init__(self, source, expression):
+        self.source = source
+        self.expression = expression
+        self._compiled = interp.ClosureCompiler().compile(expression)
+
+    def evaluate(self, budget = None):
+        """Return the Lox value of the expression. Raises LoxError for
+        runtime errors and BudgetExceeded when a limit is hit or the
+        expression is nested too deeply.
+
+        Budgets are counted node by node, so with one the tree is walked
+        by the Interpreter instead of running the compiled closures."""
+        if budget is not None:
+            budget.start()
+            return ses.Session(_core).run(self.expression, budget)
+
+        try:
+            return self._compiled()
+        except interp.LoxRuntimeError as error:
+            session = ses.Session(_core)
+            session.runtime_error(error)
+            raise ses.LoxError("runtime", session.messages) from None
+        except OverflowError:
+            # Integer literals too large to become a float
+            raise ses.LoxError("runtime", ["Number is too large."]) from None
+        except RecursionError:
+            raise bgt.depth_exceeded() from None
+
+    def __getstate__(self):
+        return {"source": self.source, "expression": self.expression}
+
+    def __setstate__(self, state):
+        self.__init__(state["source"], state["expression"])
+
+
+def compile(source, budget = None):
+    """Scan, parse and check the source and return a PreparedExpression.
+    Raises LoxError for syntax and type errors, and BudgetExceeded when a
+    limit is hit or the source is nested too deeply."""
+    session = ses.Session(_core)
+    if budget is not None:
+        budget.start()
+
+    try:
+        return PreparedExpression(source, _core.expression(session, source, budget))
+    except RecursionError:
+        raise bgt.depth_exceeded() from None
+
+
+def _benchmark(repeat = 20000):
+    """Compare the cost of one evaluation through lox.run, lox.evaluate
+    and a PreparedExpression compiled up front."""
+    import contextlib
+    import io
+    import timeit
+    import lox
+
+    source = '(1 + 2) * 3 - 4 / 5 >= -6 == !nil != ("a" + "b" == "ab")'
+    program = lox.lox()
+    expression = compile(source)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            program.run(source)
+
+    for name, call in (("lox.run", run),
+                       ("lox.evaluate", lambda: program.evaluate(source)),
+                       ("PreparedExpression.evaluate", expression.evaluate)):
+        seconds = timeit.timeit(call, number = repeat)
+        print(name + ": " + format(seconds / repeat * 1e6, ".2f") + "us per evaluation")
+
+if __name__ == "__main__":
+    _benchmark()
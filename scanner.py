@@ -64,66 +64,71 @@ class Token:
 
 class Scanner:
 
-    def __init__(self, interpreter, source):
+    # Dictionary for lookup up token literals. The tables are shared by
+    # every Scanner, so they take the scanner as an argument.
+    _token_strings = {
+        # Single character tokens
+        '(': lambda scanner, c: TokenType.LEFT_PAREN,
+        ')': lambda scanner, c: TokenType.RIGHT_PAREN,
+        '{': lambda scanner, c: TokenType.LEFT_BRACE,
+        '}': lambda scanner, c: TokenType.RIGHT_BRACE,
+        ',': lambda scanner, c: TokenType.COMMA,
+        '.': lambda scanner, c: TokenType.DOT,
+        '-': lambda scanner, c: TokenType.MINUS,
+        '+': lambda scanner, c: TokenType.PLUS,
+        ';': lambda scanner, c: TokenType.SEMICOLON,
+        '*': lambda scanner, c: TokenType.STAR,
+        # Look ahead one to match the 1 or 2 character tokens
+        '!': lambda scanner, c: TokenType.BANG_EQUAL if scanner._match('=') else TokenType.BANG,
+        '=': lambda scanner, c: TokenType.EQUAL_EQUAL if scanner._match('=') else TokenType.EQUAL,
+        '<': lambda scanner, c: TokenType.LESS_EQUAL if scanner._match('=') else TokenType.LESS,
+        '>': lambda scanner, c: TokenType.GREATER_EQUAL if scanner._match('=') else TokenType.GREATER,
+        '/': lambda scanner, c: scanner._slash_logic(),
+        # Ignore Whitespace
+        ' ':  lambda scanner, c: None,
+        '\r': lambda scanner, c: None,
+        '\t': lambda scanner, c: None,
+        # Differs from Bob's since line_number comes from array index
+        '\n': lambda scanner, c: scanner._advance_line(),
+        # Strings consume to EOL or closing "
+        '"': lambda scanner, c: scanner._consume_string()
+    }
+
+    # Dictionary for lookup of reserved words
+    _reserved_strings = {
+        "and":   TokenType.AND,
+        "class": TokenType.CLASS,
+        "else":  TokenType.ELSE,
+        "false": TokenType.FALSE,
+        "for":   TokenType.FOR,
+        "fun":   TokenType.FUN,
+        "if":    TokenType.IF,
+        "nil":   TokenType.NIL,
+        "or":    TokenType.OR,
+        "print": TokenType.RETURN,
+        "super": TokenType.SUPER,
+        "this":  TokenType.THIS,
+        "true":  TokenType.TRUE,
+        "var":   TokenType.VAR,
+        "while": TokenType.WHILE
+    }
+
+    def __init__(self, interpreter, source, line = 0, budget = None):
         """For the initialization of a scanner, we want a reference to
-        the source material as well as an empty list of tokens."""
+        the source material as well as an empty list of tokens. The line
+        number of the first line can be given for scanning a chunk taken
+        from the middle of a larger source, and a started Budget limits
+        the token count and time spent scanning."""
 
         self._interpreter = interpreter
         self._source = source
+        self._budget = budget
         self.tokens = []
 
-        # Dictionary for lookup up token literals
-        self._token_strings = {
-            # Single character tokens
-            '(': lambda c: TokenType.LEFT_PAREN,
-            ')': lambda c: TokenType.RIGHT_PAREN,
-            '{': lambda c: TokenType.LEFT_BRACE,
-            '}': lambda c: TokenType.RIGHT_BRACE,
-            ',': lambda c: TokenType.COMMA,
-            '.': lambda c: TokenType.DOT,
-            '-': lambda c: TokenType.MINUS,
-            '+': lambda c: TokenType.PLUS,
-            ';': lambda c: TokenType.SEMICOLON,
-            '*': lambda c: TokenType.STAR,
-            # Look ahead one to match the 1 or 2 character tokens
-            '!': lambda c: TokenType.BANG_EQUAL if self._match('=') else TokenType.BANG,
-            '=': lambda c: TokenType.EQUAL_EQUAL if self._match('=') else TokenType.EQUAL,
-            '<': lambda c: TokenType.LESS_EQUAL if self._match('=') else TokenType.LESS,
-            '>': lambda c: TokenType.GREATER_EQUAL if self._match('=') else TokenType.GREATER,
-            '/': lambda c: self._slash_logic(),
-            # Ignore Whitespace
-            ' ':  lambda c: None,
-            '\r': lambda c: None,
-            '\t': lambda c: None,
-            # Differs from Bob's since line_number comes from array index
-            '\n': lambda c: self._advance_line(),
-            # Strings consume to EOL or closing "
-            '"': lambda c: self._consume_string()
-        }
-
-        # Dictionary for lookup of reserved words
-        self._reserved_strings = {
-            "and":   TokenType.AND,
-            "class": TokenType.CLASS,
-            "else":  TokenType.ELSE,
-            "false": TokenType.FALSE,
-            "for":   TokenType.FOR,
-            "fun":   TokenType.FUN,
-            "if":    TokenType.IF,
-            "nil":   TokenType.NIL,
-            "or":    TokenType.OR,
-            "print": TokenType.RETURN,
-            "super": TokenType.SUPER,
-            "this":  TokenType.THIS,
-            "true":  TokenType.TRUE,
-            "var":   TokenType.VAR,
-            "while": TokenType.WHILE
-        }
-
         # Indicies for current lexeme
         self._start = 0
         self._current = 0
-        self._line = 0
+        self._line = line
 
 
     def _at_eof(self, offset = 0):
@@ -145,7 +150,7 @@ class Scanner:
 
 
         if char in self._token_strings:
-            token_type = self._token_strings[char](char)
+            token_type = self._token_strings[char](self, char)
             if token_type is not None:
                 if token_type == TokenType.STRING:
                     string_literal = self._source[(self._start+1):(self._current - 1)]
@@ -157,8 +162,13 @@ class Scanner:
             if char.isdigit():
                 self._consume_number()
                 number_string = self._source[self._start:self._current]
-                number_literal = float(number_string) if '.' in number_string else int(number_string)
-                self._add_token(TokenType.NUMBER, number_literal)
+                try:
+                    number_literal = float(number_string) if '.' in number_string else int(number_string)
+                except ValueError:
+                    # Past the interpreter's limit on digits in an int
+                    self._interpreter.scan_error(self._line, "Number is too large.")
+                else:
+                    self._add_token(TokenType.NUMBER, number_literal)
             elif self._is_valid_literal_start_character(char):
                 self._consume_identifier()
                 token_type = self._recognize_reserved_words()
@@ -244,6 +254,9 @@ class Scanner:
         text = self._source[self._start:self._current]
         self.tokens.append(Token(token_type, text, literal, self._line))
 
+        if self._budget is not None:
+            self._budget.count_token(len(self.tokens))
+
     def _slash_logic(self):
         if self._match('/'):
             self._consume_to('\n')
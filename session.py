@@ -0,0 +1,222 @@
+#! /usr/local/bin/python3
+
+import collections
+import concurrent.futures
+import threading
+
+import scanner as scn
+import parser as prs
+import interpreter as interp
+import budget as bgt
+import typechecker
+
+
+class LoxError(Exception):
+    """Raise when a source fails to scan, parse or evaluate.
+
+    kind is "syntax" for scan and parse errors, "type" for operations
+    the typechecker proves must fail and "runtime" for runtime errors,
+    and messages holds every error that was reported."""
+    def __init__(self, kind, messages):
+        super().__init__("\n".join(messages))
+        self.kind = kind
+        self.messages = messages
+
+    def __reduce__(self):
+        return (LoxError, (self.kind, self.messages))
+
+
+class Core:
+    """The part of the interpreter every session shares: checked
+    expressions cached by their source. Cached trees are never changed
+    once stored, so any number of threads may evaluate them at once."""
+
+    def __init__(self, cache_size = 1024):
+        self._cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def expression(self, session, source, budget = None):
+        """Return the checked expression for the source, scanning, parsing
+        and checking it on a cache miss. Errors are reported to the session
+        and raised as a LoxError."""
+        with self._lock:
+            cached = self._cache.get(source)
+            if cached is not None:
+                self._cache.move_to_end(source)
+
+        if cached is not None:
+            expression, token_count = cached
+            if budget is not None:
+                budget.check_tokens(token_count)
+            return expression
+
+        tokens = scn.Scanner(session, source, budget = budget).scan_tokens()
+        expression = prs.Parser(session, tokens, budget).parse()
+
+        if session.had_error or expression is None:
+            raise LoxError("syntax", session.messages)
+
+        typechecker.TypeChecker(session).check(expression)
+        if session.had_error:
+            raise LoxError("type", session.messages)
+
+        # Only trees that passed every check are worth keeping
+        with self._lock:
+            self._cache[source] = (expression, len(tokens) - 1)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last = False)
+
+        return expression
+
+
+class Session:
+    """Error state and diagnostics for a single evaluation.
+
+    Scanner, Parser, TypeChecker and Interpreter report to the session
+    they run for, so sessions on different threads never see each
+    other's errors. Use a new session for every call."""
+
+    def __init__(self, core = None):
+        self.had_error = False
+        self.had_runtime_error = False
+        self.had_budget_error = False
+        self.messages = []
+
+        self._core = Core() if core is None else core
+        self.interpreter = interp.Interpreter(self)
+
+    def evaluate(self, source, budget = None):
+        """Return the Lox value of the source. Raises LoxError, or
+        BudgetExceeded when a limit of the budget is hit or the source is
+        nested too deeply."""
+        if budget is not None:
+            budget.start()
+
+        try:
+            expression = self._core.expression(self, source, budget)
+        except bgt.BudgetExceeded as error:
+            self.budget_error(error)
+            raise
+        except RecursionError:
+            error = bgt.depth_exceeded()
+            self.budget_error(error)
+            raise error from None
+
+        return self.run(expression, budget)
+
+    def run(self, expression, budget = None):
+        """Return the value of an expression the Core has already checked.
+        The budget, if any, must already be started."""
+        try:
+            return self.interpreter.evaluate(expression, budget)
+        except interp.LoxRuntimeError as error:
+            self.runtime_error(error)
+            raise LoxError("runtime", self.messages) from None
+        except OverflowError:
+            # Integer literals too large to become a float
+            self.messages.append("Number is too large.")
+            self.had_runtime_error = True
+            raise LoxError("runtime", self.messages) from None
+        except bgt.BudgetExceeded as error:
+            self.budget_error(error)
+            raise
+        except RecursionError:
+            error = bgt.depth_exceeded()
+            self.budget_error(error)
+            raise error from None
+
+    def parse_error(self, token, msg):
+        if token.token_type == scn.TokenType.EOF:
+            self.report(token.line, "at end", msg)
+        else:
+            self.report(token.line, " at '" + token.lexeme + "'", msg)
+
+    def type_error(self, token, msg):
+        self.report(token.line, " at '" + token.lexeme + "'", msg)
+
+    def scan_error(self, line, msg):
+        self.report(line, "", msg)
+
+    def runtime_error(self, error):
+        self.messages.append(error.message + " [line " + str(error.token.line) + "]")
+        self.had_runtime_error = True
+
+    def budget_error(self, error):
+        self.messages.append("[budget] Error: " + error.message)
+        self.had_budget_error = True
+
+    def report(self, line, where, msg):
+        self.messages.append("[line " + str(line) + "] Error" + str(where) + ": " + str(msg))
+        self.had_error = True
+
+
+class Server:
+    """Evaluates sources on a thread pool, one Session per call, with one
+    Core shared between all of them."""
+
+    def __init__(self, max_workers = None, core = None):
+        self.core = Core() if core is None else core
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix = "pylox")
+
+    def evaluate(self, source, budget = None):
+        """Evaluate on the calling thread."""
+        return Session(self.core).evaluate(source, budget)
+
+    def submit(self, source, budget = None):
+        """Return a Future for the Lox value of the source. The call runs
+        with its own copy of the budget, so one budget can be given to
+        any number of calls."""
+        if budget is not None:
+            budget = budget.copy()
+        return self._executor.submit(self.evaluate, source, budget)
+
+    def close(self, wait = True):
+        self._executor.shutdown(wait = wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _stress_test(threads = 16, calls = 20000):
+    """Evaluate a mix of good and bad sources from many threads at once,
+    checking every result and error is the one its own source should give,
+    and time it. The Core caches nothing, so every call scans, parses and
+    checks its source. On a free-threaded build the threads run in
+    parallel."""
+    import sys
+    import time
+
+    cases = []
+    for i in range(200):
+        cases.append((str(i) + " * 2 + 1", float(i * 2 + 1)))
+        cases.append(('"' + str(i) + '" + "x"', str(i) + "x"))
+        cases.append((str(i) + ' + "x"', ("type", "[line 0] Error at '+': " +
+                                            "Operands must be two numbers or two strings.")))
+        cases.append(("(" + str(i) + " +", ("syntax", "[line " + str(len(str(i)) + 2) +
+                                             "] Errorat end: Expect expression.")))
+
+    def outcome(future):
+        error = future.exception()
+        if error is None:
+            return future.result()
+        return (error.kind,) + tuple(error.messages)
+
+    with Server(threads, Core(cache_size = 0)) as server:
+        start = time.perf_counter()
+        work = [cases[i % len(cases)] for i in range(calls)]
+        futures = [server.submit(source) for source, _ in work]
+        for (source, expected), future in zip(work, futures):
+            assert outcome(future) == expected, (source, outcome(future), expected)
+        elapsed = time.perf_counter() - start
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(str(calls) + " evaluations on " + str(threads) + " threads in " +
+          format(elapsed, ".2f") + "s (GIL " + ("enabled" if gil else "disabled") + ")")
+
+if __name__ == "__main__":
+    _stress_test()
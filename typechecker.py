@@ -0,0 +1,146 @@
+#! /usr/local/bin/python3
+
+import scanner
+
+NUMBER = "number"
+STRING = "string"
+BOOL = "bool"
+NIL = "nil"
+UNKNOWN = "unknown"
+
+# The interpreter's number checks test for numbers.Number, which Python's
+# bool is too, so booleans pass them. Only these types are sure to fail.
+_NOT_NUMBERS = (STRING, NIL)
+_NUMBERS = (NUMBER, BOOL)
+
+_COMPARISONS = (scanner.TokenType.GREATER,
+                scanner.TokenType.GREATER_EQUAL,
+                scanner.TokenType.LESS,
+                scanner.TokenType.LESS_EQUAL)
+
+_EQUALITIES = (scanner.TokenType.EQUAL_EQUAL,
+               scanner.TokenType.BANG_EQUAL)
+
+_ARITHMETIC = (scanner.TokenType.MINUS,
+               scanner.TokenType.SLASH,
+               scanner.TokenType.STAR)
+
+
+def _literal_type(value):
+    if value is None:
+        return NIL
+    elif isinstance(value, bool):
+        return BOOL
+    elif isinstance(value, str):
+        return STRING
+    else:
+        return NUMBER
+
+
+class TypeChecker:
+    """Infers the Lox type of every node of an expression before it runs.
+
+    Each node gets its lox_type, and nodes whose operand checks can not
+    fail are marked proven_safe so the interpreter skips those checks.
+    Operations that are sure to fail are reported to lox as type errors."""
+
+    def __init__(self, lox):
+        self._lox = lox
+
+    def check(self, expression):
+        """Annotate the expression tree and return its type."""
+        return self._infer(expression)
+
+    def _infer(self, expr):
+        expr.lox_type = expr.accept(self)
+        return expr.lox_type
+
+    def _error(self, token, msg):
+        self._lox.type_error(token, msg)
+
+    def visitChain(self, expr):
+        self._infer(expr.left)
+        return self._infer(expr.right)
+
+    def visitLiteral(self, expr):
+        return _literal_type(expr.value)
+
+    def visitGrouping(self, expr):
+        return self._infer(expr.expression)
+
+    def visitUnary(self, expr):
+        right = self._infer(expr.right)
+
+        op_type = expr.operator.token_type
+
+        if op_type is scanner.TokenType.MINUS:
+            if right in _NUMBERS:
+                expr.proven_safe = True
+            elif right in _NOT_NUMBERS:
+                self._error(expr.operator, "Operand must be a number.")
+            return NUMBER
+        elif op_type is scanner.TokenType.BANG:
+            return BOOL
+
+        return UNKNOWN
+
+    def visitBinary(self, expr):
+        left = self._infer(expr.left)
+        right = self._infer(expr.right)
+
+        op_type = expr.operator.token_type
+
+        if op_type in _COMPARISONS:
+            self._check_numbers(expr, left, right)
+            return BOOL
+
+        elif op_type in _EQUALITIES:
+            return BOOL
+
+        elif op_type in _ARITHMETIC:
+            self._check_numbers(expr, left, right)
+            return NUMBER
+
+        elif op_type is scanner.TokenType.PLUS:
+            if left in _NUMBERS and right in _NUMBERS:
+                expr.proven_safe = True
+                return NUMBER
+            elif left == STRING and right == STRING:
+                expr.proven_safe = True
+                return STRING
+            elif left != UNKNOWN and right != UNKNOWN:
+                self._error(expr.operator,
+                            "Operands must be two numbers or two strings.")
+
+        return UNKNOWN
+
+    def _check_numbers(self, expr, left, right):
+        if left in _NUMBERS and right in _NUMBERS:
+            expr.proven_safe = True
+        elif left in _NOT_NUMBERS or right in _NOT_NUMBERS:
+            self._error(expr.operator, "Operands must be numbers.")
+
+
+def _benchmark(terms = 150, repeat = 2000):
+    """Time evaluation of a literal heavy expression with and without the
+    operand checks the typechecker proves unnecessary."""
+    import timeit
+    import lox
+    import parser
+
+    source = " + ".join(["(1.5 * 2 - -3) / 4"] * terms) + ' == ' + \
+             " + ".join(['"ab"'] * terms) + ' + "c"'
+
+    program = lox.lox()
+    tokens = scanner.Scanner(program, source).scan_tokens()
+    unchecked = parser.Parser(program, tokens).parse()
+    checked = parser.Parser(program, tokens).parse()
+    TypeChecker(program).check(checked)
+
+    for name, expression in (("unchecked", unchecked), ("checked", checked)):
+        seconds = timeit.timeit(lambda: program.interpreter.evaluate(expression),
+                                number = repeat)
+        print(name + ": " + format(seconds / repeat * 1000, ".3f") + "ms per evaluation")
+
+if __name__ == "__main__":
+    _benchmark()